@@ -1,12 +1,13 @@
 import logging
 import threading
-from queue import Empty, Queue
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
 
 import ttkbootstrap as ttk
 from PIL import Image
 from pystray import Icon, Menu, MenuItem
 
-from topsoft.config import configure_logger
+from topsoft.config import configure_logger, stop_logger
 from topsoft.database import configure_database
 from topsoft.frames import AcessosFrame, CartoesAcessoFrame, ConfigurationFrame
 from topsoft.tasks import task_processamento
@@ -14,6 +15,21 @@ from topsoft.utils import get_path
 
 logger = logging.getLogger(__name__)
 
+ICON_PATH = get_path("topsoft.ico")
+_TRAY_IMAGE = None
+
+
+def get_tray_image():
+    """
+    Get the tray icon image, decoding topsoft.ico only once per process.
+    """
+
+    global _TRAY_IMAGE
+    if _TRAY_IMAGE is None:
+        with Image.open(ICON_PATH) as image:
+            _TRAY_IMAGE = image.copy()
+    return _TRAY_IMAGE
+
 
 class App(ttk.Window):
     def __init__(self, *args, **kwargs):
@@ -24,51 +40,97 @@ class App(ttk.Window):
         self.geometry("800x600")
 
         # Window Icon:
-        self.iconbitmap(get_path("topsoft.ico"))
+        self.iconbitmap(ICON_PATH)
 
         # Windows Closing:
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # Database (configured while the widgets are being built):
+        self.db_ready = Future()
+        threading.Thread(target=self.configure_database, daemon=True).start()
+
         # Notebook
         self.notebook = ttk.Notebook(self)
 
-        # Frames:
-        self.frames = {
-            "Cartões de Acesso": CartoesAcessoFrame(self.notebook, controller=self),
-            "Acessos": AcessosFrame(self.notebook, controller=self),
-            "Configurações": ConfigurationFrame(self.notebook, controller=self),
+        # Frames (each one is built the first time its tab is selected):
+        self.frame_classes = {
+            "Cartões de Acesso": CartoesAcessoFrame,
+            "Acessos": AcessosFrame,
+            "Configurações": ConfigurationFrame,
         }
+        self.frames = {}
 
-        for name, frame in self.frames.items():
-            self.notebook.add(frame, text=name)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        for name in self.frame_classes:
+            self.notebook.add(ttk.Frame(self.notebook), text=name)
 
         # Notebook:
         self.notebook.pack(expand=True, fill="both")
+        self.on_tab_changed()
 
         # Processamento:
+        self.bind("<<ProcessingUpdate>>", self._on_processing_update)
         self.processing_queue = None
         self.processing_thread = None
-        self.processing_stop_event = threading.Event()
+        self.processing_stop = False
+        self.processing_wakeup = None
         self.start_processing_thread()
 
+        # Exit:
+        self._exiting = False
+
         # System Tray:
         self.tray_icon = None
         self.create_tray_icon()
 
+    def on_tab_changed(self, event=None):
+        """
+        Build the frame of the selected tab, if it wasn't built yet.
+        The frame is packed inside the placeholder that holds its tab.
+        """
+
+        container = self.nametowidget(self.notebook.select())
+        name = self.notebook.tab(container, "text")
+        if name in self.frames:
+            return
+
+        frame = self.frame_classes[name](container, controller=self)
+        frame.pack(expand=True, fill="both")
+        self.frames[name] = frame
+
+    def configure_database(self):
+        """
+        Configure the database and resolve the db_ready future.
+        Anything that queries the database must wait on self.db_ready.result() first.
+        """
+
+        try:
+            configure_database()
+            self.db_ready.set_result(True)
+        except Exception as e:
+            logger.error(f"Failed to configure the database: {e}")
+            self.db_ready.set_exception(e)
+
     def create_tray_icon(self):
         """
         Create a system tray icon for the application.
+        The tray menu callbacks run on pystray's thread, so they are scheduled onto the Tk thread.
         """
 
-        image = Image.open(get_path("topsoft.ico"))
+        # Only one tray icon (and its message loop) per application:
+        if self.tray_icon is not None:
+            return
+
+        image = get_tray_image()
 
         menu = Menu(
-            MenuItem("Show", self.show_window),
-            MenuItem("Exit", self.exit_app),
+            MenuItem("Show", lambda: self.after(0, self.show_window)),
+            MenuItem("Exit", lambda: self.after(0, self.exit_app)),
         )
 
         self.tray_icon = Icon("TopSoft", image, "TopSoft", menu)
 
+        # A daemon thread, so a tray icon that wasn't stopped doesn't keep the process alive:
         threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
     def start_processing_thread(self):
@@ -76,42 +138,73 @@ class App(ttk.Window):
         Start the background task in a separate thread.
         """
 
-        # Stop the previous thread if it's running
-        if self.processing_thread and self.processing_thread.is_alive():
-            self.processing_stop_event.set()
-            self.processing_thread.join()
-
-        # Start a new thread
-        self.processing_queue = Queue()
-        self.processing_stop_event.clear()
+        self.processing_queue = SimpleQueue()
+        self.processing_stop = False
+        self.processing_wakeup = SimpleQueue()
         self.processing_thread = threading.Thread(
-            target=task_processamento,
-            args=(self.processing_stop_event, self.processing_queue),
+            target=self.run_processing_task,
+            args=(
+                lambda: self.processing_stop,
+                self.processing_wakeup,
+                self.processing_queue,
+                self,
+            ),
             daemon=True,
         )
         self.processing_thread.start()
 
-        # Watch the queue for new items
-        self.after(100, self.watch_queue)
+    def reconfigure_processing(self):
+        """
+        Wake the background task up, so it starts a new cycle with the current settings.
+        """
 
-    def watch_queue(self):
+        if self.processing_thread and self.processing_thread.is_alive():
+            self.processing_wakeup.put("reconfigure")
+        else:
+            self.start_processing_thread()
+
+    def run_processing_task(self, *args):
         """
-        Watch the processing queue for new items.
-        This method can be used to update the UI or perform actions based on the queue.
+        Wait for the database to be ready and run the background task.
         """
 
-        # Read from the queue without blocking
-        try:
-            acessos_ids = self.processing_queue.get_nowait()
+        self.db_ready.result()
+        task_processamento(*args)
+
+    def stop_processing_thread(self):
+        """
+        Signal the background task to stop and wait for it to finish.
+        The None sentinel wakes the task up if it is waiting for the next cycle.
+        Tk events are still processed while waiting, since the worker may be generating <<ProcessingUpdate>>.
+        """
+
+        if self.processing_thread and self.processing_thread.is_alive():
+            self.processing_stop = True
+            self.processing_wakeup.put(None)
 
-            # TODO: Fire an event instead of directly calling the frame method...
-            if not acessos_ids:
-                logger.debug(f"Received {len(acessos_ids)} access IDs from the queue")
-                self.frames["Acessos"].update_sync_status(acessos_ids)
-        except Empty:
-            pass
-        finally:
-            self.after(100, self.watch_queue)  # Continue watching the queue
+            # Keep serving Tk while waiting, so a Tk call the worker is already making can return:
+            while self.processing_thread.is_alive():
+                self.update()
+                self.processing_thread.join(0.05)
+
+    def _on_processing_update(self, event):
+        """
+        Drain the processing queue when the worker signals new items.
+        A burst of items triggers a single dispatch, so the whole queue is consumed in one pass
+        and the Acessos table is updated once with every drained ID.
+        """
+
+        acessos_ids = set()
+        while True:
+            try:
+                acessos_ids.update(self.processing_queue.get_nowait())
+            except Empty:
+                break
+
+        # The Acessos frame loads the current status when it is first built
+        if acessos_ids and "Acessos" in self.frames:
+            logger.debug(f"Received {len(acessos_ids)} access IDs from the queue")
+            self.frames["Acessos"].update_sync_status(acessos_ids)
 
     def on_closing(self):
         """
@@ -132,25 +225,35 @@ class App(ttk.Window):
         Handle the exit event.
         """
 
+        # Exiting processes Tk events while waiting for the background task, so a second "Exit" can arrive meanwhile
+        if self._exiting:
+            return
+        self._exiting = True
+
         # Stop the processing thread
-        if self.processing_thread and self.processing_thread.is_alive():
-            self.processing_stop_event.set()
-            self.processing_thread.join()
+        self.stop_processing_thread()
 
-        # Stop the Tray Icon thread
+        # Stop the Tray Icon
         if self.tray_icon:
             self.tray_icon.stop()
+            self.tray_icon = None
+
+        # Cancel pending callbacks, so none of them fires while the window is destroyed
+        for after_id in self.tk.splitlist(self.tk.call("after", "info")):
+            self.after_cancel(after_id)
 
         # Destroy the window
         self.destroy()
 
+        # Flush the pending log records
+        stop_logger()
+
     def run(self):
         self.mainloop()
 
 
 if __name__ == "__main__":
     configure_logger()
-    configure_database()
 
     app = App()
     app.run()
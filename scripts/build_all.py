@@ -15,21 +15,54 @@ Usage:
 """
 
 import argparse
+import ast
+import importlib.util
 import os
+import re
 import subprocess
 import sys
 from pathlib import Path
 
+# Modules PyInstaller would bundle that are never used at runtime
+EXCLUDED_MODULES = [
+    "tkinter.test",
+    "unittest",
+    "pydoc_data",
+    "xmlrpc",
+    "test",
+]
+
+# The excludes list of the Analysis in a PyInstaller spec file (e.g. "excludes=[],")
+_SPEC_EXCLUDES_RE = re.compile(r"excludes=(\[[^\]]*\])")
+
 
 def run_command(cmd, cwd=None):
-    """Run command and return success status"""
-    try:
-        result = subprocess.run(
-            cmd, cwd=cwd, capture_output=True, text=True, check=True
-        )
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        return False, e.stderr
+    """Run command, streaming its output, and return success status and output"""
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    )
+
+    output = []
+    for line in process.stdout:
+        print(line, end="")
+        output.append(line)
+
+    return process.wait() == 0, "".join(output)
+
+
+def load_sync_version():
+    """Load the sync_version script that sits next to this one, regardless of the CWD"""
+    spec = importlib.util.spec_from_file_location(
+        "sync_version", Path(__file__).parent / "sync_version.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 
 def bump_and_sync_version(bump_type):
@@ -44,17 +77,12 @@ def bump_and_sync_version(bump_type):
 
     print(f"✅ Poetry version updated: {output}")
 
-    # Get new version
-    success, output = run_command(["poetry", "version"])
-    if not success:
-        print(f"❌ Failed to get version: {output}")
-        return False, None
-
-    new_version = output.strip().split()[1]
+    # Poetry prints the new version as the last word (e.g. "... from 0.1.0 to 0.1.1")
+    new_version = output.strip().rsplit(" ", 1)[-1]
 
     # Sync version across files
     print("🔄 Syncing versions across project files...")
-    import sync_version
+    sync_version = load_sync_version()
 
     try:
         sync_version.main()
@@ -65,6 +93,26 @@ def bump_and_sync_version(bump_type):
         return False, None
 
 
+def add_spec_excludes(spec_file):
+    """Add the EXCLUDED_MODULES to the excludes of the spec file's Analysis, keeping the ones it already has"""
+    content = spec_file.read_text(encoding="utf-8")
+
+    match = _SPEC_EXCLUDES_RE.search(content)
+    if not match:
+        print(f"⚠️  No excludes found in {spec_file.name}, skipping...")
+        return
+
+    excludes = ast.literal_eval(match.group(1))
+    missing = [module for module in EXCLUDED_MODULES if module not in excludes]
+    if not missing:
+        return
+
+    excludes += missing
+    content = content[: match.start(1)] + repr(excludes) + content[match.end(1) :]
+    spec_file.write_text(content, encoding="utf-8")
+    print(f"✅ Added excludes to {spec_file.name}: {', '.join(missing)}")
+
+
 def build_executable():
     """Build executable using PyInstaller"""
     print("\n🔨 Building executable with PyInstaller...")
@@ -74,9 +122,14 @@ def build_executable():
 
     if spec_file.exists():
         print(f"📄 Using spec file: {spec_file}")
+        add_spec_excludes(spec_file)
         success, output = run_command(["pyinstaller", str(spec_file)], cwd=project_root)
     else:
         print("📄 Using direct PyInstaller command...")
+        excludes = []
+        for module in EXCLUDED_MODULES:
+            excludes += ["--exclude-module", module]
+
         success, output = run_command(
             [
                 "pyinstaller",
@@ -88,6 +141,7 @@ def build_executable():
                 str(project_root / "topsoft.ico"),
                 "--add-data",
                 f"{project_root / 'topsoft.ico'};.",
+                *excludes,
                 str(project_root / "main.py"),
             ],
             cwd=project_root,
@@ -101,23 +155,25 @@ def build_executable():
     return True
 
 
-def build_installer():
-    """Build installer using Inno Setup"""
-    print("\n🔨 Building installer with Inno Setup...")
-
-    project_root = Path(__file__).parent.parent
-
-    # Find Inno Setup
+def find_iscc():
+    """Find the Inno Setup compiler, returning None if it's not installed"""
     iscc_paths = [
         r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe",
         r"C:\Program Files\Inno Setup 6\ISCC.exe",
     ]
 
-    iscc_path = None
     for path in iscc_paths:
         if Path(path).exists():
-            iscc_path = path
-            break
+            return path
+
+    return None
+
+
+def build_installer(iscc_path):
+    """Build installer using Inno Setup"""
+    print("\n🔨 Building installer with Inno Setup...")
+
+    project_root = Path(__file__).parent.parent
 
     if not iscc_path:
         print("❌ Inno Setup not found!")
@@ -162,7 +218,7 @@ def main():
         sys.exit(1)
 
     # Step 3: Build installer
-    if not build_installer():
+    if not build_installer(find_iscc()):
         sys.exit(1)
 
     # Success
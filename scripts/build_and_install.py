@@ -13,26 +13,40 @@ This will:
 """
 
 import os
+import shutil
 import subprocess
 import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+# Import our version management utilities
+import sync_version
+
 
 def get_current_version():
     """Get current version from pyproject.toml"""
-    try:
-        import sync_version
+    return sync_version.get_version_from_pyproject() or "unknown"
+
+
+def run_streaming(cmd, cwd=None, tail_size=200):
+    """Run command streaming its output to the terminal, returning the exit code and the output tail"""
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    )
 
-        return sync_version.get_version_from_pyproject()
-    except:
-        # Fallback to poetry command
-        try:
-            result = subprocess.run(
-                ["poetry", "version"], capture_output=True, text=True, check=True
-            )
-            return result.stdout.split()[1]
-        except:
-            return "unknown"
+    tail = deque(maxlen=tail_size)
+    for line in process.stdout:
+        print(line, end="")
+        tail.append(line)
+
+    return process.wait(), "".join(tail)
 
 
 def build_exe():
@@ -47,15 +61,13 @@ def build_exe():
 
     if spec_file.exists():
         print(f"📄 Using spec file: {spec_file}")
-        result = subprocess.run(
+        returncode, output = run_streaming(
             ["pyinstaller", str(spec_file)],
             cwd=project_root,
-            capture_output=True,
-            text=True,
         )
     else:
         print("📄 No spec file found, using direct PyInstaller command...")
-        result = subprocess.run(
+        returncode, output = run_streaming(
             [
                 "pyinstaller",
                 "--onefile",
@@ -69,13 +81,11 @@ def build_exe():
                 str(project_root / "main.py"),
             ],
             cwd=project_root,
-            capture_output=True,
-            text=True,
         )
 
-    if result.returncode != 0:
+    if returncode != 0:
         print("❌ Error building executable:")
-        print(result.stderr)
+        print(output)
         return False
     else:
         print("✅ Executable built successfully!")
@@ -83,6 +93,23 @@ def build_exe():
         return True
 
 
+@lru_cache(maxsize=1)
+def find_iscc():
+    """Find the Inno Setup compiler, checking PATH before the default install locations"""
+    iscc_path = shutil.which("iscc")
+    if iscc_path:
+        return iscc_path
+
+    for path in (
+        r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe",
+        r"C:\Program Files\Inno Setup 6\ISCC.exe",
+    ):
+        if Path(path).is_file():
+            return path
+
+    return None
+
+
 def build_installer():
     """Build installer using Inno Setup"""
     print("\n🔨 Building installer with Inno Setup...")
@@ -91,17 +118,7 @@ def build_installer():
     project_root = script_dir.parent
 
     # Check for Inno Setup
-    iscc_paths = [
-        r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe",
-        r"C:\Program Files\Inno Setup 6\ISCC.exe",
-        "iscc.exe",  # If in PATH
-    ]
-
-    iscc_path = None
-    for path in iscc_paths:
-        if Path(path).exists() or path == "iscc.exe":
-            iscc_path = path
-            break
+    iscc_path = find_iscc()
 
     if not iscc_path:
         print("❌ Inno Setup not found!")
@@ -118,16 +135,11 @@ def build_installer():
     print(f"📄 Using installer script: {iss_file}")
     print(f"🛠️  Using ISCC: {iscc_path}")
 
-    result = subprocess.run(
-        [iscc_path, str(iss_file)],
-        cwd=project_root,
-        capture_output=True,
-        text=True,
-    )
+    returncode, output = run_streaming([iscc_path, str(iss_file)], cwd=project_root)
 
-    if result.returncode != 0:
+    if returncode != 0:
         print("❌ Error building installer:")
-        print(result.stderr)
+        print(output)
         return False
     else:
         print("✅ Installer built successfully!")
@@ -145,22 +157,34 @@ def build_installer():
         return True
 
 
+def tool_available(tool):
+    """Check if a tool runs with --version"""
+    try:
+        subprocess.run([tool, "--version"], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
 def check_prerequisites():
     """Check if required tools are available"""
     print("🔍 Checking prerequisites...")
 
+    # Check both tools at once, so their startup times overlap
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        poetry_check = executor.submit(tool_available, "poetry")
+        pyinstaller_check = executor.submit(tool_available, "pyinstaller")
+
     # Check if we're in a poetry environment
-    try:
-        subprocess.run(["poetry", "--version"], capture_output=True, check=True)
+    if poetry_check.result():
         print("✅ Poetry found")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    else:
         print("⚠️  Poetry not found - make sure you're in the right environment")
 
     # Check for PyInstaller
-    try:
-        subprocess.run(["pyinstaller", "--version"], capture_output=True, check=True)
+    if pyinstaller_check.result():
         print("✅ PyInstaller found")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    else:
         print("❌ PyInstaller not found")
         print("Install with: pip install pyinstaller")
         return False
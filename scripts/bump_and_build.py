@@ -7,22 +7,20 @@ import sync_version
 
 
 def bump_poetry_version(bump_type):
-    """Bump version using poetry and sync all files"""
-    subprocess.run(["poetry", "version", bump_type], check=True)
+    """Bump version using poetry, sync all files and return the new version"""
+    result = subprocess.run(
+        ["poetry", "version", bump_type], check=True, capture_output=True, text=True
+    )
+    print(result.stdout.strip())
+
+    # Poetry prints the new version as the last word (e.g. "... from 0.1.0 to 0.1.1")
+    new_version = result.stdout.strip().rsplit(" ", 1)[-1]
 
     # Sync versions across all files
     print("🔄 Syncing versions across project files...")
     sync_version.main()
 
-
-def get_poetry_version():
-    """Get current version from pyproject.toml"""
-    version = sync_version.get_version_from_pyproject()
-    if not version:
-        # Fallback to poetry command
-        result = subprocess.run(["poetry", "version"], capture_output=True, text=True)
-        version = result.stdout.split()[1]
-    return version
+    return new_version
 
 
 def build_exe():
@@ -41,12 +39,12 @@ def build_exe():
             f"{os.path.join(script_dir, '../topsoft.ico')};.",
             os.path.join(script_dir, "../main.py"),
         ],
-        capture_output=True,
-        text=True,
+        check=False,
     )
 
     if result.returncode != 0:
-        print("Error building executable:", result.stderr)
+        # The tool output was already streamed to the terminal
+        print(f"Error building executable (exit code {result.returncode}).")
     else:
         print("Executable built successfully.")
 
@@ -59,12 +57,12 @@ def build_installer():
             r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe",
             os.path.join(script_dir, "../installer.iss"),
         ],
-        capture_output=True,
-        text=True,
+        check=False,
     )
 
     if result.returncode != 0:
-        print("Error building installer:", result.stderr)
+        # The tool output was already streamed to the terminal
+        print(f"Error building installer (exit code {result.returncode}).")
     else:
         print("Installer built successfully.")
 
@@ -78,8 +76,7 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
-    bump_poetry_version(args.bump_type)
-    current_version = get_poetry_version()
+    current_version = bump_poetry_version(args.bump_type)
     print(f"✅ Version bumped to {current_version} and all files updated.")
 
     build_exe()
@@ -18,6 +18,7 @@ This will:
 4. Optionally commit changes to git
 """
 
+import re
 import subprocess
 import sys
 from pathlib import Path
@@ -26,6 +27,9 @@ from typing import List, Optional
 # Import our version sync script
 import sync_version
 
+# A specific version: letters and digits, optionally separated by ".", "-" or "+"
+_LEVEL_RE = re.compile(r"[.+\-]*[A-Za-z0-9][A-Za-z0-9.+\-]*")
+
 
 def run_command(cmd: List[str], cwd: Optional[Path] = None) -> tuple[bool, str]:
     """Run a command and return success status and output"""
@@ -38,25 +42,28 @@ def run_command(cmd: List[str], cwd: Optional[Path] = None) -> tuple[bool, str]:
         return False, e.stderr.strip()
 
 
-def bump_version(level: str) -> bool:
-    """Bump version using poetry and sync all files"""
+def bump_version(level: str) -> Optional[str]:
+    """Bump version using poetry, sync all files and return the new version"""
     print(f"🚀 Bumping version: {level}")
 
     # Run poetry version command
     success, output = run_command(["poetry", "version", level])
     if not success:
         print(f"❌ Failed to bump version with poetry: {output}")
-        return False
+        return None
 
     print(f"✅ Poetry version updated: {output}")
 
+    # Poetry prints the new version as the last word (e.g. "... from 0.1.0 to 0.1.1")
+    new_version = output.rsplit(" ", 1)[-1]
+
     # Sync versions across all files
     print("\n🔄 Syncing versions across project files...")
     try:
         sync_version.main()
-        return True
+        return new_version
     except SystemExit:
-        return False
+        return None
 
 
 def commit_version_bump(version: str) -> bool:
@@ -117,10 +124,7 @@ def main():
 
     # Validate version level
     valid_levels = ["patch", "minor", "major"]
-    if (
-        level not in valid_levels
-        and not level.replace(".", "").replace("-", "").replace("+", "").isalnum()
-    ):
+    if level not in valid_levels and not _LEVEL_RE.fullmatch(level):
         print(f"❌ Invalid version level: {level}")
         print(
             f"Valid levels: {', '.join(valid_levels)} or a specific version like 1.2.3"
@@ -128,14 +132,9 @@ def main():
         sys.exit(1)
 
     # Bump version and sync files
-    if not bump_version(level):
-        sys.exit(1)
-
-    # Get the current version for git operations
-    current_version = sync_version.get_version_from_pyproject()
+    current_version = bump_version(level)
     if not current_version:
-        print("⚠️  Could not get current version, skipping git operations")
-        return
+        sys.exit(1)
 
     # Optionally commit changes
     commit_version_bump(current_version)
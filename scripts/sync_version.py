@@ -12,25 +12,38 @@ Usage:
 
 import re
 import sys
+import tomllib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+_ISS_VERSION_RE = re.compile(r'#define MyAppVersion "[^"]*"')
+_ISS_OUTPUT_RE = re.compile(r'#define MyOutputBaseFilename "topsoft_v[^"]*"')
+_SPEC_VERSION_RE = re.compile(r"# Version: [^\n]*")
+
+
+@lru_cache(maxsize=1)
 def get_version_from_pyproject() -> Optional[str]:
-    """Extract version from pyproject.toml"""
+    """Extract version from pyproject.toml (in the CWD, or else in the project root)"""
     pyproject_path = Path("pyproject.toml")
+    if not pyproject_path.exists():
+        pyproject_path = PROJECT_ROOT / "pyproject.toml"
+
     if not pyproject_path.exists():
         print("❌ pyproject.toml not found!")
         return None
 
-    content = pyproject_path.read_text(encoding="utf-8")
+    pyproject = tomllib.loads(pyproject_path.read_text(encoding="utf-8"))
 
-    # Look for version = "x.y.z" pattern
-    version_match = re.search(
-        r'^version\s*=\s*["\']([^"\']+)["\']', content, re.MULTILINE
-    )
-    if version_match:
-        return version_match.group(1)
+    # Look for the [project] version, or the legacy [tool.poetry] one
+    version = pyproject.get("project", {}).get("version")
+    if not version:
+        version = pyproject.get("tool", {}).get("poetry", {}).get("version")
+    if version:
+        return version
 
     print("❌ Could not find version in pyproject.toml")
     return None
@@ -43,20 +56,21 @@ def update_installer_iss(version: str) -> bool:
         print("⚠️  installer.iss not found, skipping...")
         return True
 
-    content = iss_path.read_text(encoding="utf-8")
+    original = iss_path.read_text(encoding="utf-8")
 
     # Update version definition
-    content = re.sub(
-        r'#define MyAppVersion "[^"]*"', f'#define MyAppVersion "{version}"', content
-    )
+    content = _ISS_VERSION_RE.sub(f'#define MyAppVersion "{version}"', original)
 
     # Update output filename
-    content = re.sub(
-        r'#define MyOutputBaseFilename "topsoft_v[^"]*"',
-        f'#define MyOutputBaseFilename "topsoft_v{version}_win64"',
-        content,
+    content = _ISS_OUTPUT_RE.sub(
+        f'#define MyOutputBaseFilename "topsoft_v{version}_win64"', content
     )
 
+    # Skip the write when the file is already at this version
+    if content == original:
+        print(f"✅ installer.iss already at version {version}")
+        return True
+
     iss_path.write_text(content, encoding="utf-8")
     print(f"✅ Updated installer.iss to version {version}")
     return True
@@ -84,9 +98,13 @@ def update_spec_file(version: str) -> bool:
         spec_path.write_text(content, encoding="utf-8")
         print(f"✅ Added version comment to topsoft.spec: {version}")
     else:
-        # Update existing version comment
-        content = re.sub(r"# Version: [^\n]*", f"# Version: {version}", content)
-        spec_path.write_text(content, encoding="utf-8")
+        # Update existing version comment (skipping the write when it's already at this version)
+        updated = _SPEC_VERSION_RE.sub(f"# Version: {version}", content)
+        if updated == content:
+            print(f"✅ topsoft.spec already at version {version}")
+            return True
+
+        spec_path.write_text(updated, encoding="utf-8")
         print(f"✅ Updated version comment in topsoft.spec: {version}")
 
     return True
@@ -96,17 +114,20 @@ def main():
     """Main function to sync versions across all files"""
     print("🔄 Syncing versions across project files...")
 
-    # Get version from pyproject.toml
+    # Get version from pyproject.toml (it may have just been bumped by poetry)
+    get_version_from_pyproject.cache_clear()
     version = get_version_from_pyproject()
     if not version:
         sys.exit(1)
 
     print(f"📦 Current version: {version}")
 
-    # Update all files
-    success = True
-    success &= update_installer_iss(version)
-    success &= update_spec_file(version)
+    # Update all files (each one is read and written independently, so they are updated at once)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = executor.map(
+            lambda update: update(version), (update_installer_iss, update_spec_file)
+        )
+        success = all(list(results))
 
     if success:
         print(f"✅ All files synchronized to version {version}")
@@ -1,18 +1,44 @@
+import asyncio
 import logging
-from datetime import datetime
+from collections import Counter
 from functools import partial
+from importlib.util import find_spec
 from typing import Tuple
 
 import aiometer
 import httpx
+import orjson
 
 from topsoft.constants import API_BASE_URL, MAX_AT_ONCE, MAX_PER_SECOND
 from topsoft.models import Acesso
 from topsoft.secrets import get_api_key
-from topsoft.settings import get_cutoff
+from topsoft.settings import get_cutoff_date
 
 logger = logging.getLogger(__name__)
 
+# Connections are kept alive between processing cycles (the default interval is one minute):
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=90,
+)
+
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Concurrent posts are multiplexed over a single connection when HTTP/2 support (httpx[http2]) is installed:
+HTTP2 = find_spec("h2") is not None
+
+# Throttled (or temporarily unavailable) posts are retried after the delay the server asks for:
+POST_RETRIES = 3
+RETRY_STATUS_CODES = (429, 503)
+MAX_RETRY_DELAY = 60
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+_headers: dict | None = None
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+
 
 def get_header():
     """
@@ -27,22 +53,94 @@ def get_header():
         logger.error("API key not found")
         raise ValueError("API key is required for API requests")
 
-    return {
-        "Authorization": api_key,
-    }
+    # Reuse the headers while the API key stays the same (a new key from set_api_key rebuilds them):
+    global _headers
+    if _headers is None or _headers["Authorization"] != api_key:
+        _headers = {
+            "Authorization": api_key,
+        }
+
+    return _headers
+
+
+def get_client() -> httpx.Client:
+    """
+    Get the shared HTTP client, so connections are reused across requests.
+    The client is recreated if the API key has changed.
+    """
+
+    global _client
+
+    headers = get_header()
+    if (
+        _client is None
+        or _client.headers.get("Authorization") != headers["Authorization"]
+    ):
+        if _client is not None:
+            _client.close()
+        _client = httpx.Client(
+            base_url=API_BASE_URL,
+            headers=headers,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+        )
+
+    return _client
+
+
+async def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client, so connections are reused across requests.
+    The client is bound to the running event loop, so it must always be used from the same one.
+    The client is recreated if the API key has changed.
+    """
+
+    global _async_client
+
+    headers = get_header()
+    if (
+        _async_client is None
+        or _async_client.headers.get("Authorization") != headers["Authorization"]
+    ):
+        if _async_client is not None:
+            await _async_client.aclose()
+        _async_client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            headers=headers,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            http2=HTTP2,
+        )
+
+    return _async_client
+
+
+async def close_clients():
+    """
+    Close the shared HTTP clients.
+    """
+
+    global _client, _async_client
+
+    if _client is not None:
+        _client.close()
+        _client = None
+
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
 
 def get_students_from_api():
     # Attempt to fetch the list of students from the API:
     try:
-        with httpx.Client(base_url=API_BASE_URL, headers=get_header()) as client:
-            response = client.get("lista_alunos/")
+        response = get_client().get("lista_alunos/")
 
-            # Raise an error if the request was not successful:
-            response.raise_for_status()
+        # Raise an error if the request was not successful:
+        response.raise_for_status()
 
-            # If the request was successful, return the JSON response:
-            return response.json()
+        # If the request was successful, return the JSON response:
+        return orjson.loads(response.content)
     except httpx.RequestError as e:
         logger.error(f"Request error while fetching students: {e}")
         raise Exception("Failed to fetch students from the API") from e
@@ -51,94 +149,176 @@ def get_students_from_api():
     return None
 
 
-async def post_acesso(client, acesso) -> Tuple[Acesso, bool] | Tuple[None, None]:
+def get_retry_delay(response: httpx.Response, attempt: int) -> float:
     """
-    Function to post a single access record to the API.
-    This function checks if the access record is already synced and if it is valid before attempting to post it to the API.
+    Get how many seconds to wait before retrying a throttled request.
+    The Retry-After (or retry-after-ms) header is used when present, otherwise the delay grows exponentially.
     """
 
-    # If already synced, skip posting:
-    if acesso.synced is True:
-        return acesso, False
+    try:
+        if "retry-after-ms" in response.headers:
+            return min(
+                float(response.headers["retry-after-ms"]) / 1000, MAX_RETRY_DELAY
+            )
+        if "retry-after" in response.headers:
+            return min(float(response.headers["retry-after"]), MAX_RETRY_DELAY)
+    except ValueError:
+        # Retry-After may also be an HTTP date, which falls back to the exponential delay
+        pass
+
+    return min(2**attempt, MAX_RETRY_DELAY)
 
-    # If access record is not valid, skip posting:
-    acesso_dt = datetime.combine(acesso.date, acesso.time)
-    cutoff = datetime.strptime(get_cutoff(), "%d/%m/%Y")
 
-    if acesso_dt < cutoff:
-        return acesso, False
+async def post_acesso(client, acesso, errors: Counter) -> Tuple[Acesso, bool]:
+    """
+    Function to post a single access record to the API.
+    The access record must already have been checked by group_pending_acessos
+    (not synced, not before the cutoff and with an aluno associated with its card).
+    Failures are counted by exception type in errors, so the caller logs them once per run.
+    """
 
-    # Ignore acesso where there is not aluno associated with the card:
-    if not acesso.cartao_acesso or not acesso.cartao_acesso.aluno:
-        logger.warning(f"Access record {acesso} has no associated cartao.")
-        # TODO: Print every single error is making the logs too verbose and too slow.
-        return acesso, False
+    payload = {
+        "data_hora": acesso.data_hora,
+        "tipo_entrada_saida": acesso.tipo_entrada_saida,
+        "matricula": acesso.cartao_acesso.aluno.matricula,
+        "id_responsavel_acompanhante": None,
+        "comentario": None,
+    }
 
     # API Request to post data:
-    try:
-        # Post the access record to the API:
-        response = await client.post(
-            "marcar_frequencia_aluno/",
-            json={
-                "data_hora": f"{acesso_dt.strftime('%Y-%m-%dT%H:%M:%S')}",
-                "tipo_entrada_saida": ("E" if acesso.marcacao == "010" else "S"),
-                "matricula": acesso.cartao_acesso.aluno.matricula,
-                "id_responsavel_acompanhante": None,
-                "comentario": None,
-            },
-        )
+    for attempt in range(POST_RETRIES + 1):
+        try:
+            # Post the access record to the API:
+            response = await client.post(
+                "marcar_frequencia_aluno/",
+                content=orjson.dumps(payload),
+                headers=JSON_HEADERS,
+            )
 
-        # Raise an error if the request was not successful:
-        response.raise_for_status()
+            # Wait and retry if the server is throttling the requests:
+            if response.status_code in RETRY_STATUS_CODES and attempt < POST_RETRIES:
+                await asyncio.sleep(get_retry_delay(response, attempt))
+                continue
+
+            # Raise an error if the request was not successful:
+            response.raise_for_status()
 
-        # Return acesso if successful:
-        if response.status_code == 200:
-            # Log the successful post:
-            logger.debug(f"Access record {acesso.id} posted successfully.")
+            # Return acesso if successful:
+            if response.status_code == 200:
+                # Log the successful post (lazily formatted, it runs for every record):
+                logger.debug("Access record %s posted successfully.", acesso.id)
 
-            # Return the access record and success status:
-            return acesso, True
-    except Exception as e:
-        logger.error(f"Failed to send payload {acesso}")
-        logger.exception(e)
+                # Return the access record and success status:
+                return acesso, True
+        except Exception as e:
+            # Any failure only fails this record, so the rest of the batch is still posted and marked as synced
+            errors[type(e).__name__] += 1
+            logger.debug("Failed to send payload %r: %s", acesso, e, exc_info=True)
+
+        break
 
     return acesso, False
 
 
-async def post_accessos_concurrently(acessos, stop_event=None):
+def group_pending_acessos(acessos) -> dict[tuple, list[Acesso]]:
+    """
+    Filters out the access records that are synced, before the cutoff or without an aluno,
+    and groups the rest by the payload they would send (e.g. the same aluno on two turnstiles).
+    Only the first record of each group is posted, the others are duplicates that share its status.
+
+    Parameters:
+    - acessos (List[Acesso]): A list of access records to be posted.
+
+    Returns:
+    - Dict mapping (matricula, date, time, tipo_entrada_saida) to the records with that payload.
+    """
+
+    # The cutoff is date-only, so records are compared by date:
+    cutoff = get_cutoff_date()
+
+    groups = {}
+    without_aluno = 0
+    for acesso in acessos:
+        # If already synced or before the cutoff, skip posting:
+        if acesso.synced is True or acesso.date < cutoff:
+            continue
+
+        # Ignore acesso where there is not aluno associated with the card:
+        if not acesso.cartao_acesso or not acesso.cartao_acesso.aluno:
+            without_aluno += 1
+            continue
+
+        key = (
+            acesso.cartao_acesso.aluno.matricula,
+            acesso.date,
+            acesso.time,
+            acesso.tipo_entrada_saida,
+        )
+        groups.setdefault(key, []).append(acesso)
+
+    if without_aluno:
+        logger.warning(f"{without_aluno} access records have no associated aluno")
+
+    duplicates = sum(len(group) for group in groups.values()) - len(groups)
+    if duplicates:
+        logger.info(f"Skipping {duplicates} duplicated access records")
+
+    return groups
+
+
+async def post_accessos_concurrently(groups, stop_event=None):
     """
     Send data to ActivitySoft concurrently using the API.
-    This function takes a list of access records (bilhetes),
-    checks if they are valid and not already synced, and posts them to the API.
-    It returns a list of results containing the access records and their corresponding status codes.
+    This function takes groups of access records with the same payload (see group_pending_acessos),
+    posts the first record of each group, and gives the other records of the group the same status.
+    It returns a list of results containing the posted access records and their corresponding status.
 
     Parameters:
-    - bilhetes (List[Acesso]): A list of access records to be posted.
+    - groups (List[List[Acesso]]): Groups of access records to be posted.
     - stop_event (threading.Event, optional): An event to signal when to stop processing.
 
     Returns:
-    - Async generator yielding tuples of (Acesso, bool) where bool indicates success.
+    - List of tuples of (Acesso, bool) where bool indicates success.
     """
 
     # TODO: Use stop_event somehow...
 
-    total = len(acessos)
+    total = len(groups)
     logger.info(f"Starting to post {total} access records")
 
-    async with httpx.AsyncClient(base_url=API_BASE_URL, headers=get_header()) as client:
-        try:
-            # Use aiometer to post access records concurrently:
-            results = await aiometer.run_all(
-                [partial(post_acesso, client, acesso) for acesso in acessos],
-                max_at_once=MAX_AT_ONCE,
-                max_per_second=MAX_PER_SECOND,
-            )
+    if not groups:
+        return []
 
-            return results
-        except Exception as e:
-            logger.error(f"Error in aiometer.run_all: {e}")
-            logger.exception(e)
-            raise
+    client = await get_async_client()
+    errors = Counter()
+
+    results = []
+
+    try:
+        # Use aiometer to post access records concurrently (tasks are created as slots free up):
+        async with aiometer.amap(
+            partial(post_acesso, client, errors=errors),
+            [group[0] for group in groups],
+            max_at_once=MAX_AT_ONCE,
+            max_per_second=MAX_PER_SECOND,
+        ) as posted:
+            async for result in posted:
+                results.append(result)
+    except Exception as e:
+        logger.error(f"Error in aiometer.amap: {e}")
+        logger.exception(e)
+        raise
+
+    if errors:
+        logger.error(f"Failed to post {errors.total()} access records: {dict(errors)}")
+
+    # Duplicates share the status of the record that was posted in their place (results come in completion order):
+    posted_ids = {acesso.id for acesso, success in results if success}
+    results.extend(
+        (acesso, group[0].id in posted_ids) for group in groups for acesso in group[1:]
+    )
 
     # Log final summary
     logger.info(f"Completed posting {total} records")
+
+    return results
@@ -1,29 +1,70 @@
+import copy
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 
 from decouple import config
 from rich.logging import RichHandler
 
+_listener: QueueListener | None = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the formatting to the listener's handlers.
+    The default prepare() formats the record (traceback included) on the calling thread and drops exc_info,
+    which would also keep RichHandler from rendering rich tracebacks.
+    """
+
+    def prepare(self, record):
+        # Only the message is merged now, since the arguments may change before the listener formats them:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
 
 def configure_logger():
     """
     Configure the logger for the application.
+    Calling it again is a no-op, so the handlers (and topsoft.log) are only attached once.
     """
 
-    log_level = config("LOGGING_LEVEL", default=logging.INFO)
+    global _listener
+    if _listener is not None:
+        return
+
+    log_level = str(config("LOGGING_LEVEL", default="INFO")).upper()
+    if log_level.isdigit():
+        log_level = int(log_level)
+    else:
+        log_level = logging.getLevelNamesMapping()[log_level]
+
+    # Record attributes that are never formatted:
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+
+    # The caller's function and path require a stack walk per record, only pay for it when debugging:
+    debugging = log_level < logging.INFO
+    if not debugging:
+        logging._srcfile = None
+    func_name = "%(funcName)s - " if debugging else ""
 
     # Handlers:
     file_handler = logging.FileHandler("topsoft.log")
     file_handler.setLevel(log_level)
     file_handler.setFormatter(
         logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s - %(message)s"
+            f"%(asctime)s - %(name)s - %(levelname)s - {func_name}%(message)s"
         )
     )
 
-    console_handler = RichHandler(rich_tracebacks=True)
+    console_handler = RichHandler(rich_tracebacks=True, show_path=debugging)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(
-        logging.Formatter("%(name)s - %(funcName)s - %(message)s")
+        logging.Formatter(f"%(name)s - {func_name}%(message)s")
     )
 
     # Suppress third-party libraries logging:
@@ -37,8 +78,28 @@ def configure_logger():
     logging.getLogger("keyring").setLevel(logging.WARNING)
     logging.getLogger("asyncio").setLevel(logging.WARNING)
 
-    # Logger:
+    # Logger (records are formatted and written by the listener's thread):
+    log_queue = SimpleQueue()
+    _listener = QueueListener(
+        log_queue,
+        console_handler,
+        file_handler,
+        respect_handler_level=True,
+    )
+    _listener.start()
+
     logging.basicConfig(
         level=log_level,
-        handlers=[console_handler, file_handler],
+        handlers=[LazyQueueHandler(log_queue)],
     )
+
+
+def stop_logger():
+    """
+    Stop the logging listener, flushing the records still in the queue.
+    """
+
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -18,6 +18,10 @@ UPDATE_URL = config(
     "UPDATE_URL",
     default="https://api.github.com/repos/viniciusccosta/topsoft/releases/latest",
 )
+UPDATE_CHECK_INTERVAL = config("UPDATE_CHECK_INTERVAL", default=60, cast=int)
 
 MAX_AT_ONCE = config("MAX_AT_ONCE", default=1000, cast=int)
 MAX_PER_SECOND = config("MAX_PER_SECOND", default=5, cast=int)
+POST_BATCH_SIZE = config("POST_BATCH_SIZE", default=500, cast=int)
+
+ACESSOS_TABLE_LIMIT = config("ACESSOS_TABLE_LIMIT", default=5000, cast=int)
@@ -1,7 +1,8 @@
 from contextlib import contextmanager
-from threading import local
 from typing import Generator
 
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlmodel import Session, create_engine
 
 from topsoft.models import SQLModel
@@ -9,19 +10,34 @@ from topsoft.models import SQLModel
 DATABASE_URL = "sqlite:///topsoft.db"
 engine = create_engine(DATABASE_URL, echo=False)
 
-# Thread-local storage for sessions
-_thread_local = local()
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """WAL lets the GUI read while the background task writes, and NORMAL sync is safe with WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+# One session per thread. Objects aren't expired on commit, so reading them afterwards doesn't reload each one:
+_scoped_session = scoped_session(
+    sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
+)
 
 
 def configure_database() -> None:
     SQLModel.metadata.create_all(engine)
 
+    # create_all skips existing tables along with their indexes, so indexes added later are created here:
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
 
 def get_session() -> Session:
     """Get the current thread's database session, creating one if needed."""
-    if not hasattr(_thread_local, "session") or _thread_local.session is None:
-        _thread_local.session = Session(engine)
-    return _thread_local.session
+    return _scoped_session()
 
 
 @contextmanager
@@ -40,6 +56,4 @@ def get_db_session() -> Generator[Session, None, None]:
 
 def close_current_session() -> None:
     """Close the current thread's session if it exists."""
-    if hasattr(_thread_local, "session") and _thread_local.session is not None:
-        _thread_local.session.close()
-        _thread_local.session = None
+    _scoped_session.remove()
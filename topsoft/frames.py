@@ -1,14 +1,18 @@
 import logging
 import threading
-from datetime import datetime
 from time import sleep
 from tkinter import Frame, filedialog
 
 import ttkbootstrap as ttk
 from ttkbootstrap.dialogs import Messagebox
-from ttkbootstrap.tableview import Tableview
+from ttkbootstrap.tableview import ASCENDING, DESCENDING, Tableview
 
-from topsoft.constants import DEFAULT_INTERVAL, MAX_INTERVAL, MIN_INTERVAL
+from topsoft.constants import (
+    ACESSOS_TABLE_LIMIT,
+    DEFAULT_INTERVAL,
+    MAX_INTERVAL,
+    MIN_INTERVAL,
+)
 from topsoft.models import Acesso, Aluno, CartaoAcesso
 from topsoft.repository import (
     bind_matricula_to_cartao_acesso_v2 as bind_matricula_to_cartao_acesso,
@@ -18,15 +22,100 @@ from topsoft.settings import (
     get_bilhetes_path,
     get_cutoff,
     get_interval,
-    set_bilhetes_path,
-    set_cutoff,
-    set_interval,
+    set_settings,
 )
 
 logger = logging.getLogger(__name__)
 
+# Sync status icons, indexed by the synced flag:
+SYNC_ICONS = ("🚫", "✅")
+
+# Rows inserted into a table before letting Tk handle its events:
+INSERT_CHUNK_SIZE = 100
+
+
+def center_headings(table: Tableview) -> None:
+    """
+    Centers the headings of all columns of the table.
+    Tableview sets the anchor of each heading itself, which overrides a "Treeview.Heading" style anchor.
+    """
+    for cid in table.cidmap:
+        table.align_heading_center(cid=cid)
+
 
-class CartoesAcessoFrame(Frame):
+class ChunkedTableMixin:
+    """
+    Fills the frame's self.table (a Tableview) in chunks of INSERT_CHUNK_SIZE rows,
+    letting Tk handle its pending events between them.
+    """
+
+    # Pending chunk of rows being inserted into the table:
+    _insert_job = None
+
+    def _cancel_insert_rows(self):
+        """
+        Stops inserting the rows of a previous update.
+        """
+        if self._insert_job is not None:
+            self.after_cancel(self._insert_job)
+            self._insert_job = None
+
+    def _insert_rows_in_chunks(self, rows_data, start=0):
+        """
+        Inserts the rows into the table, starting at the given index.
+        The first chunk is shown right away, and the user's search and sort are reapplied after the last one.
+        """
+        self._insert_job = None
+
+        # The frame may have been destroyed between chunks
+        if not self.winfo_exists():
+            return
+
+        # Insert the chunk (Treeview items are only created for the rows of the visible page)
+        end = start + INSERT_CHUNK_SIZE
+        insert_row = self.table.insert_row
+        for row_data in rows_data[start:end]:
+            insert_row("end", row_data)
+
+        if start == 0:
+            self.table.load_table_data(clear_filters=True)
+
+        if end < len(rows_data):
+            self._insert_job = self.after_idle(
+                self._insert_rows_in_chunks, rows_data, end
+            )
+        elif start > 0:
+            self._reapply_table_view()
+
+    def _reapply_table_view(self):
+        """
+        Reapplies the search and the sort the user made while the rows were being inserted,
+        so the rows of the later chunks go through them too.
+        """
+        table = self.table
+
+        # Search again with the current criteria (the same case-insensitive match as the search box)
+        criteria = str(table.searchcriteria).lower()
+        if table.is_filtered and criteria:
+            filtered = table.tablerows_filtered
+            filtered.clear()
+            filtered.extend(
+                row
+                for row in table.tablerows
+                if any(criteria in str(value).lower() for value in row.values)
+            )
+
+        # The sorted column shows an arrow in its heading, and its columnsort was flipped after sorting
+        for column in table.tablecolumns:
+            if table.view.heading(column.cid, "text") != column.headertext:
+                sort = DESCENDING if column.columnsort == ASCENDING else ASCENDING
+                table.sort_column_data(cid=column.cid, sort=sort)
+                return
+
+        table.load_table_data()
+
+
+class CartoesAcessoFrame(ChunkedTableMixin, Frame):
     """
     A class that represents a frame for managing CartaoAcesso and binding them to Aluno.
     """
@@ -75,7 +164,8 @@ class CartoesAcessoFrame(Frame):
         self.table = Tableview(
             self,
             coldata=cols,
-            paginated=False,
+            paginated=True,
+            pagesize=25,
             searchable=True,
             autofit=True,
             autoalign=False,
@@ -86,9 +176,13 @@ class CartoesAcessoFrame(Frame):
 
         self.table.view.bind("<Double-1>", self.handle_row_double_click)
 
+        # Edit window (built on the first edit), with the dropdown choices as {"Nome (matricula)": matricula}:
+        self._edit_window = None
+        self._editing = None
+        self._edit_choices = None
+
         # Align headings to the center
-        for cid in self.table.cidmap:
-            self.table.align_heading_center(cid=cid)
+        center_headings(self.table)
 
         # Populate the table with data
         self.populate_table()
@@ -104,22 +198,9 @@ class CartoesAcessoFrame(Frame):
         """
         Populates the table with CartaoAcesso and their associated Aluno.
         """
-        # Clear existing data
-        self.table.delete_rows(indices=None, iids=None)
-        # TODO: Just update without clearing the table
-
-        # Fetch all CartaoAcesso records with their associated Aluno
-        cartoes = CartaoAcesso.get_all()
-
-        # Populate the table
-        row_datas = []
-        for i, cartao in enumerate(cartoes):
-            aluno_info = (
-                f"{cartao.aluno.nome} ({cartao.aluno.matricula})"
-                if cartao.aluno
-                else "Não vinculado"
-            )
-            row_datas.append((cartao.numeracao, aluno_info))
+        # Fetch all CartaoAcesso records with their associated Aluno, already formatted as the table rows
+        self.controller.db_ready.result()
+        row_datas = CartaoAcesso.get_all_with_aluno_info()
 
         self.after(0, lambda: self._update_table_ui(row_datas))
 
@@ -128,68 +209,125 @@ class CartoesAcessoFrame(Frame):
     def _update_table_ui(self, rows_data):
         """
         Updates the table UI with prepared data.
+        The table is only rebuilt when the data has changed.
         """
+        # The frame may have been destroyed while the data was being fetched
+        if not self.winfo_exists():
+            return
+
+        # Stop inserting the rows of a previous update
+        self._cancel_insert_rows()
+
+        if [row.values for row in self.table.tablerows] == list(map(list, rows_data)):
+            return
+
         # Clear existing data
         self.table.delete_rows(indices=None, iids=None)
 
-        # Insert all rows
-        for row_data in rows_data:
-            self.table.insert_row("end", row_data)
-
-        # Load the table data
-        self.table.load_table_data(clear_filters=True)
+        # Insert the rows in chunks, so the UI stays responsive
+        self._insert_rows_in_chunks(rows_data)
 
     def handle_row_double_click(self, event, *args, **kwargs):
         """
         Handles the edit action when a user double-clicks a row.
         """
-        # Get the selected row
-        selected_row = self.table.get_rows(selected=True)[0].values
-        cartao_numeracao = selected_row[0]
-        aluno_info = selected_row[1]
+        # Get the selected row straight from its Treeview item, instead of scanning every row for the selected one
+        selection = self.table.view.selection()
+        if not selection:
+            return
+        row = self.table.get_row(iid=selection[0])
+        cartao_numeracao = row.values[0]
+        aluno_info = row.values[1]
 
         # Open a new window for editing
-        self.open_edit_window(cartao_numeracao, aluno_info)
+        self.open_edit_window(cartao_numeracao, aluno_info, row)
 
-    def open_edit_window(self, cartao_numeracao, aluno_info):
+    def open_edit_window(self, cartao_numeracao, aluno_info, row=None):
         """
-        Opens a new window to edit the binding of a CartaoAcesso to an Aluno.
+        Opens a window to edit the binding of a CartaoAcesso to an Aluno.
+        If the table row is given, only that row is updated after saving, instead of repopulating the table.
+        The window is built on the first edit and reused (hidden in between) by the next ones.
         """
-        edit_window = ttk.Toplevel(self)
-        edit_window.title("Editar Vinculação de Cartão")
-        edit_window.geometry("400x200")
+        if self._edit_window is None or not self._edit_window.winfo_exists():
+            self._build_edit_window()
+
+        self._editing = (cartao_numeracao, row)
 
         # Display the current CartaoAcesso
-        ttk.Label(edit_window, text=f"Cartão de Acesso: {cartao_numeracao}").pack(
-            padx=10, pady=10
-        )
+        self._edit_label.config(text=f"Cartão de Acesso: {cartao_numeracao}")
 
-        # Dropdown for selecting a new Aluno # TODO: Add a search filter
-        ttk.Label(edit_window, text="Vincular a Aluno:").pack(padx=10, pady=5)
-        aluno_var = ttk.StringVar()
-        aluno_dropdown = ttk.Combobox(edit_window, textvariable=aluno_var)
-        aluno_dropdown.pack(padx=10, pady=5)
-
-        # Fetch all Aluno records for the dropdown
-        alunos = Aluno.get_all(sort_by="nome")
-        aluno_dropdown["values"] = [
-            f"{aluno.nome} ({aluno.matricula})" for aluno in alunos
-        ]
+        # Fetch all Aluno records for the dropdown on every edit, since the background task may have synced new ones
+        self._edit_choices = self.get_aluno_choices()
+        self._edit_combo["values"] = list(self._edit_choices)
+        self._edit_combo.set("")
 
-        # Save button
-        def save_binding():
-            selected_aluno = aluno_dropdown.get()
-            if selected_aluno:
-                aluno_matricula = selected_aluno.split("(")[-1].strip(")")
+        self._edit_window.deiconify()
+        self._edit_window.lift()
+
+    def _build_edit_window(self):
+        """
+        Builds the edit window, which is hidden instead of destroyed when closed.
+        """
+        self._edit_window = ttk.Toplevel(self)
+        self._edit_window.title("Editar Vinculação de Cartão")
+        self._edit_window.geometry("400x200")
+        self._edit_window.protocol("WM_DELETE_WINDOW", self._edit_window.withdraw)
+
+        # Display the current CartaoAcesso
+        self._edit_label = ttk.Label(self._edit_window)
+        self._edit_label.pack(padx=10, pady=10)
 
-                if bind_matricula_to_cartao_acesso(cartao_numeracao, aluno_matricula):
-                    self.populate_table()
-                    edit_window.destroy()
+        # Dropdown for selecting a new Aluno # TODO: Add a search filter
+        ttk.Label(self._edit_window, text="Vincular a Aluno:").pack(padx=10, pady=5)
+        self._edit_combo = ttk.Combobox(self._edit_window)
+        self._edit_combo.pack(padx=10, pady=5)
 
-        ttk.Button(edit_window, text="Salvar", command=save_binding).pack(
+        # Save button
+        ttk.Button(self._edit_window, text="Salvar", command=self.save_binding).pack(
             padx=10, pady=10
         )
 
+    def save_binding(self):
+        """
+        Binds the CartaoAcesso being edited to the selected Aluno.
+        """
+        cartao_numeracao, row = self._editing
+
+        # The typed text must be one of the choices, otherwise the window stays open to fix it
+        selected_aluno = self._edit_combo.get()
+        if selected_aluno not in self._edit_choices:
+            Messagebox.show_warning(
+                "Selecione um aluno da lista.",
+                "Aluno não encontrado",
+                parent=self._edit_window,
+            )
+            return
+
+        aluno_matricula = self._edit_choices[selected_aluno]
+        if not bind_matricula_to_cartao_acesso(cartao_numeracao, aluno_matricula):
+            Messagebox.show_error(
+                "Não foi possível vincular o cartão ao aluno.",
+                "Erro",
+                parent=self._edit_window,
+            )
+            return
+
+        if row is not None:
+            # Setting the values also refreshes the row in the view
+            row.values = [cartao_numeracao, selected_aluno]
+        else:
+            self.populate_table()
+        self._edit_window.withdraw()
+
+    def get_aluno_choices(self):
+        """
+        Gets the dropdown choices for the edit window, as {"Nome (matricula)": matricula}.
+        """
+        return {
+            f"{aluno.nome} ({aluno.matricula})": aluno.matricula
+            for aluno in Aluno.get_all(sort_by="nome")
+        }
+
     def export_cartoes_acesso(self):
         """
         Exports the CartaoAcesso data to a file.
@@ -248,6 +386,7 @@ class CartoesAcessoFrame(Frame):
         self.export_button.config(state="disabled")
 
         # Read the file and gather data
+        cartoes = []
         with open(filepath, "r", encoding="utf-8") as file:
             for line in file:
                 line = line.strip()
@@ -255,32 +394,13 @@ class CartoesAcessoFrame(Frame):
                 if line and len(line) >= 56:  # Ensure line is long enough
                     numero = line[0:16]
                     nome = line[16 : 16 + 40].strip()
+                    cartoes.append((numero, nome))
 
-                    # Create a new CartaoAcesso instance
-                    cartao, created = CartaoAcesso.get_or_create(numeracao=numero)
-
-                    # If the card already exists, skip to the next line
-                    if not created:
-                        logger.info(f"Cartão de Acesso {numero} já existe, pulando...")
-                        continue
-
-                    # TODO: Uma possibilidade seria vincular um cartão, que ainda não foi vinculado, a um aluno existente
-                    # TODO: Outra possibilidade seria atualizar o cartão a cada importação
+        # TODO: Uma possibilidade seria vincular um cartão, que ainda não foi vinculado, a um aluno existente
+        # TODO: Outra possibilidade seria atualizar o cartão a cada importação
 
-                    # Set the associated Aluno if the name is provided
-                    # TODO: Lidar com caso de nomes duplicados
-                    aluno = Aluno.find_by_name(nome)
-
-                    if aluno:
-                        cartao.aluno = aluno
-                        cartao.save()
-                        logger.info(
-                            f"Cartão de Acesso {numero} criado e vinculado a Aluno {nome}"
-                        )
-                    else:
-                        logger.info(f"Cartão de Acesso {numero} criado")
-
-        # TODO: Bulk get/create/update CartaoAcesso and Aluno instead within a loop
+        # Create the new cards, bound to the Aluno with the given name, with a couple of queries and a single commit
+        CartaoAcesso.bulk_import(cartoes)
 
         # Success message
         Messagebox.show_info("Cartões de Acesso importados com sucesso!", "Sucesso")
@@ -291,7 +411,7 @@ class CartoesAcessoFrame(Frame):
         self.export_button.config(state="normal")
 
 
-class AcessosFrame(Frame):
+class AcessosFrame(ChunkedTableMixin, Frame):
     """
     A class that represents a frame in a Tkinter application.
     Inherits from the Tkinter Frame class.
@@ -321,6 +441,23 @@ class AcessosFrame(Frame):
             {"text": "Catraca", "stretch": True},  # "cid": "catraca",
         ]
 
+        # Only the most recent records are loaded, older ones are loaded on demand:
+        self._limit = ACESSOS_TABLE_LIMIT
+
+        self.frame_total = ttk.Frame(self)
+        self.frame_total.pack(side="bottom", fill="x", padx=10, pady=(0, 10))
+
+        self.lbl_total = ttk.Label(self.frame_total)
+        self.lbl_total.pack(side="left")
+
+        self.btn_load_more = ttk.Button(
+            self.frame_total,
+            text="Carregar mais antigos",
+            command=self.load_more,
+            state="disabled",
+        )
+        self.btn_load_more.pack(side="right")
+
         self.table = Tableview(
             self,
             coldata=coldata,
@@ -335,8 +472,7 @@ class AcessosFrame(Frame):
         self.table.pack(expand=True, fill="both", padx=10, pady=10)
         # TODO: Where is the vertical scrollbar ?
 
-        for cid in self.table.cidmap:
-            self.table.align_heading_center(cid=cid)
+        center_headings(self.table)
 
         # TODO: Hide the ID column (not working...)
         self.table.get_column(0).hide()  # TODO: Use cid instead of index
@@ -360,14 +496,18 @@ class AcessosFrame(Frame):
         Thread worker for populating the table.
         """
         # Fetch data in background thread
-        acessos = Acesso.get_all()
+        # Only the most recent records are loaded, the table would otherwise grow with every access ever made
+        self.controller.db_ready.result()
+        total = Acesso.count()
+        acessos = Acesso.get_all(limit=self._limit)
 
         # Prepare all data
         rows_data = []
         for acesso in acessos:
-            synced = "✅" if acesso.synced else "🚫"
+            synced = SYNC_ICONS[bool(acesso.synced)]
             cartao = acesso.cartao_acesso.numeracao
-            data_hora = datetime.combine(acesso.date, acesso.time)
+            # Formatted straight to the text the Treeview shows (the same as str(datetime.combine(...)))
+            data_hora = f"{acesso.date} {acesso.time}"
             catraca = acesso.catraca
 
             rows_data.append(
@@ -382,41 +522,73 @@ class AcessosFrame(Frame):
 
         # Update UI in main thread
         self.after(0, lambda: self._update_table_ui(rows_data))
+        self.after(0, lambda: self._update_total(len(rows_data), total))
 
         # TODO: Hide loading indicator if used
 
     def _update_table_ui(self, rows_data):
         """
         Updates the table UI with prepared data.
+        The table is only rebuilt when the data has changed.
         """
+        # The frame may have been destroyed while the data was being fetched
+        if not self.winfo_exists():
+            return
+
+        # Stop inserting the rows of a previous update
+        self._cancel_insert_rows()
+
+        if [row.values for row in self.table.tablerows] == list(map(list, rows_data)):
+            return
+
         # Clear existing data
         self.table.delete_rows(indices=None, iids=None)
 
-        # Insert all rows
-        for row_data in rows_data:
-            self.table.insert_row("end", row_data)
+        # Insert the rows in chunks, so the UI stays responsive
+        self._insert_rows_in_chunks(rows_data)
+
+    def _update_total(self, shown, total):
+        """
+        Shows how many of the access records are loaded, and whether older ones can be loaded.
+        """
+        if not self.winfo_exists():
+            return
 
-        # Load the table data
-        self.table.load_table_data(clear_filters=True)
+        if shown < total:
+            self.lbl_total.config(
+                text=f"Mostrando os {shown} acessos mais recentes de {total}"
+            )
+            self.btn_load_more.config(state="normal")
+        else:
+            self.lbl_total.config(text=f"Mostrando todos os {total} acessos")
+            self.btn_load_more.config(state="disabled")
 
-    def update_sync_status(self, acesso_ids):
+    def load_more(self):
+        """
+        Loads ACESSOS_TABLE_LIMIT more of the older access records into the table.
         """
-        Updates the sync status of a specific row in the table.
+        self.btn_load_more.config(state="disabled")
+        self._limit += ACESSOS_TABLE_LIMIT
+        self.populate_table()
 
-        :param row_id: The ID of the row to update.
-        :param synced: The new sync status (True or False).
+    def update_sync_status(self, acesso_ids):
         """
+        Marks the rows of the given access IDs as synced in a single pass over the table.
 
-        # TODO: Use a dict instead of iterating through rows to find the right row
+        :param acesso_ids: A collection with the IDs of the synced access records.
+        """
 
+        acesso_ids = set(acesso_ids)
         logger.debug(f"Updating sync status for access {len(acesso_ids)} IDs")
 
         for row in self.table.tablerows:
-            if row.values[0] in acesso_ids:
+            if row.values[0] in acesso_ids and row.values[1] != SYNC_ICONS[True]:
                 # TODO: Not sure if this is the best way to update the row...
-                row.values[1] = "✅"
+                row.values[1] = SYNC_ICONS[True]
                 row.refresh()
 
+        self.table.view.update_idletasks()
+
 
 class ConfigurationFrame(Frame):
     """
@@ -441,14 +613,8 @@ class ConfigurationFrame(Frame):
         self.lf_bilhetes = ttk.LabelFrame(self, text="Bilhetes")
         self.lf_bilhetes.pack(expand=False, fill="x", padx=10, pady=10)
 
-        self.bilhetes_path = ttk.StringVar()
-        if bilhete_path := get_bilhetes_path():
-            self.bilhetes_path.set(bilhete_path)
-
-        self.entry_bilhetes_path = ttk.Entry(
-            self.lf_bilhetes,
-            textvariable=self.bilhetes_path,
-        )
+        self.entry_bilhetes_path = ttk.Entry(self.lf_bilhetes)
+        self.entry_bilhetes_path.insert(0, get_bilhetes_path() or "")
         self.entry_bilhetes_path.pack(
             expand=True, fill="x", padx=10, pady=10, side="left"
         )
@@ -490,27 +656,16 @@ class ConfigurationFrame(Frame):
             to=MAX_INTERVAL,
             textvariable=self.intervalo,
             increment=1,
-            validate="all",
-            validatecommand=(self.register(self.validate_interval), "%P"),
         )
         self.spin_intervalo.pack(expand=True, fill="both", padx=10, pady=10)
 
         # ActivitySoft API Key
-        self.api_key = ttk.StringVar()
-        if api_key := get_api_key():
-            self.api_key.set(api_key)
-        else:
-            self.api_key.set("")
-
         self.lf_api = ttk.LabelFrame(self, text="ActivitySoft API Key")
         self.lf_api.pack(expand=False, fill="x", padx=10, pady=10)
 
-        self.entry_api = ttk.Entry(
-            self.lf_api,
-            textvariable=self.api_key,
-            show="*",
-            state="readonly",
-        )
+        self.entry_api = ttk.Entry(self.lf_api, show="*")
+        self.entry_api.insert(0, get_api_key() or "")
+        self.entry_api.config(state="readonly")
         self.entry_api.pack(
             expand=True,
             fill="x",
@@ -540,23 +695,19 @@ class ConfigurationFrame(Frame):
         )
         self.btn_save.pack(expand=False, padx=10, pady=10)
 
-    def validate_interval(self, value):
+    def get_interval(self):
         """
-        Validates the interval value to ensure it stays within the allowed range.
+        Gets the interval typed in the Spinbox, clamped to the allowed range.
         """
 
         try:
-            value = int(value)
-            if value < MIN_INTERVAL:
-                self.intervalo.set(MIN_INTERVAL)  # Force minimum value
-                return False
-            elif value > MAX_INTERVAL:
-                self.intervalo.set(MAX_INTERVAL)  # Force maximum value
-                return False
-            return True
+            intervalo = int(self.spin_intervalo.get())
         except ValueError:
-            self.intervalo.set(DEFAULT_INTERVAL)  # Default to minimum if invalid input
-            return False
+            intervalo = DEFAULT_INTERVAL
+
+        intervalo = max(MIN_INTERVAL, min(intervalo, MAX_INTERVAL))
+        self.intervalo.set(intervalo)
+        return intervalo
 
     def browse_bilhetes_path(self):
         """
@@ -570,37 +721,36 @@ class ConfigurationFrame(Frame):
         )
 
         if filepath:
-            self.bilhetes_path.set(filepath)
+            self.entry_bilhetes_path.delete(0, "end")
+            self.entry_bilhetes_path.insert(0, filepath)
 
     def enable_entry_api(self):
         """
         Enables the entry field for the ActivitySoft API key.
         """
 
-        if self.change_api.get() == "1":
-            self.entry_api.config(state="normal")
-            self.api_key.set("")
-        else:
+        self.entry_api.config(state="normal")
+        self.entry_api.delete(0, "end")
+
+        if self.change_api.get() != "1":
+            self.entry_api.insert(0, get_api_key() or "")
             self.entry_api.config(state="readonly")
-            self.api_key.set(get_api_key())
 
     def save_config(self):
         """
         Saves the configuration settings.
         """
-        bilhete_path = self.bilhetes_path.get()
+        bilhete_path = self.entry_bilhetes_path.get()
         activitysoft_key = self.entry_api.get()
-        intervalo = self.intervalo.get()
+        intervalo = self.get_interval()
         cutoff = self.cutoff.get()
 
         # Save the settings to the database
-        set_bilhetes_path(bilhete_path)
-        set_interval(intervalo)
+        set_settings(bilhete_path, intervalo, cutoff)
         set_api_key(activitysoft_key)
-        set_cutoff(cutoff)
 
-        # Update the settings in the controller
-        self.controller.start_processing_thread()
+        # Apply the settings to the background task
+        self.controller.reconfigure_processing()
 
         # Show a success message
         Messagebox().show_info(
@@ -6,17 +6,19 @@ from sqlmodel import (
     JSON,
     Column,
     Field,
+    Index,
     Relationship,
     Session,
     SQLModel,
     UniqueConstraint,
+    func,
     select,
 )
 
 logger = logging.getLogger(__name__)
 
 
-from sqlalchemy import JSON
+from sqlalchemy import JSON, case, update
 
 
 class BaseModel(SQLModel):
@@ -52,6 +54,13 @@ class BaseModel(SQLModel):
         statement = select(cls)
         return session.exec(statement).all()
 
+    @classmethod
+    def count(cls) -> int:
+        """Count all instances"""
+        session = cls._get_session()
+        statement = select(func.count()).select_from(cls)
+        return session.exec(statement).one()
+
     @classmethod
     def filter_by(cls, **kwargs) -> List["BaseModel"]:
         """Filter instances by given criteria"""
@@ -264,6 +273,9 @@ class Aluno(BaseModel, table=True):
         session = cls._get_session()
 
         try:
+            # The API returns every student, so all existing ones are loaded in a single query:
+            existing = {aluno.id: aluno for aluno in session.exec(select(cls)).all()}
+
             for data in alunos_json:
                 # Convert date string to datetime if needed
                 if data.get("data_nascimento"):
@@ -275,7 +287,7 @@ class Aluno(BaseModel, table=True):
                         pass  # leave as-is or set None
 
                 # Build or update the Aluno instance
-                aluno = session.get(cls, data["id"])
+                aluno = existing.get(data["id"])
                 if aluno:
                     # Update existing student
                     for key, val in data.items():
@@ -326,6 +338,22 @@ class CartaoAcesso(BaseModel, table=True):
             logger.error(f"Error fetching cartoes de acesso: {e}")
             return []
 
+    @classmethod
+    def get_all_with_aluno_info(cls) -> List[tuple[str, str]]:
+        """Get (numeracao, "Nome (matricula)") of all access cards, formatted by SQLite instead of per ORM instance"""
+        try:
+            session = cls._get_session()
+            aluno_info = case(
+                (Aluno.id.is_(None), "Não vinculado"),
+                # A NULL matricula would make the whole concatenation NULL, so it's shown as Python would:
+                else_=Aluno.nome + " (" + func.coalesce(Aluno.matricula, "None") + ")",
+            )
+            statement = select(cls.numeracao, aluno_info).outerjoin(Aluno)
+            return [tuple(row) for row in session.exec(statement).all()]
+        except Exception as e:
+            logger.error(f"Error fetching cartoes de acesso: {e}")
+            return []
+
     @staticmethod
     def from_string(data: str) -> Optional["CartaoAcesso"]:
         """
@@ -427,6 +455,54 @@ class CartaoAcesso(BaseModel, table=True):
             return new_cards
         return []
 
+    @classmethod
+    def bulk_import(cls, cartoes: List[tuple[str, str]]) -> List["CartaoAcesso"]:
+        """Create the missing cards from (numeracao, aluno nome) pairs, bound to the Aluno with that name, in one transaction"""
+        session = cls._get_session()
+
+        # Get existing cards
+        numeracoes = {numeracao for numeracao, _ in cartoes}
+        statement = select(cls.numeracao).where(cls.numeracao.in_(numeracoes))
+        existing_numeracoes = set(session.exec(statement).all())
+
+        # Get the alunos by name (the first one wins if the name is duplicated)
+        # TODO: Lidar com caso de nomes duplicados
+        nomes = {nome for _, nome in cartoes if nome}
+        statement = select(Aluno).where(Aluno.nome.in_(nomes)).order_by(Aluno.id)
+        alunos = {}
+        for aluno in session.exec(statement).all():
+            alunos.setdefault(aluno.nome, aluno)
+
+        new_cards = []
+        for numeracao, nome in cartoes:
+            # If the card already exists (or is repeated in the file), skip it
+            if numeracao in existing_numeracoes:
+                logger.info(f"Cartão de Acesso {numeracao} já existe, pulando...")
+                continue
+            existing_numeracoes.add(numeracao)
+
+            aluno = alunos.get(nome)
+            new_cards.append(
+                cls(numeracao=numeracao, aluno_id=aluno.id if aluno else None)
+            )
+
+            if aluno:
+                logger.info(
+                    f"Cartão de Acesso {numeracao} criado e vinculado a Aluno {nome}"
+                )
+            else:
+                logger.info(f"Cartão de Acesso {numeracao} criado")
+
+        if new_cards:
+            try:
+                session.add_all(new_cards)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+
+        return new_cards
+
     # ...existing code...
 
 
@@ -458,8 +534,20 @@ class Acesso(BaseModel, table=True):
             name="uq_acesso_marcacao_date_time_cat_cartao",
             comment="Unique constraint for Acesso table",
         ),
+        # Backs the most-recent-first listing (ORDER BY date DESC, time DESC LIMIT n) with an index scan:
+        Index("ix_acesso_date_time", "date", "time"),
     )
 
+    @property
+    def data_hora(self) -> str:
+        """Date and time in the API format (YYYY-MM-DDTHH:MM:SS)"""
+        return f"{self.date.isoformat()}T{self.time.isoformat(timespec='seconds')}"
+
+    @property
+    def tipo_entrada_saida(self) -> str:
+        """Entry/exit type in the API format ("E"=Entrada, "S"=Saída)"""
+        return "E" if self.marcacao == "010" else "S"
+
     # Custom model-specific methods
     @classmethod
     def get_all(cls, offset=None, limit=None) -> List["Acesso"]:
@@ -586,10 +674,13 @@ class Acesso(BaseModel, table=True):
             return False
 
         try:
+            # A single UPDATE statement, which also refreshes the records loaded in the session:
             session = cls._get_session()
-            for acesso in acessos:
-                acesso.synced = status
-                session.add(acesso)
+            session.execute(
+                update(cls)
+                .where(cls.id.in_([acesso.id for acesso in acessos]))
+                .values(synced=status)
+            )
             session.commit()
             logger.info(f"Updated {len(acessos)} access records to synced={status}.")
             return True
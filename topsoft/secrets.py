@@ -14,5 +14,8 @@ def get_api_key() -> str | None:
 
 def set_api_key(api_key: str) -> None:
     global _cached_api_key
+    if api_key == get_api_key():
+        return
+
     keyring.set_password(SERVICE, ACCOUNT, api_key)
     _cached_api_key = api_key
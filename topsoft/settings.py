@@ -1,5 +1,6 @@
 import logging
-from datetime import date
+from datetime import date, datetime
+from functools import lru_cache
 
 from pickledb import PickleDB
 
@@ -20,11 +21,14 @@ sdb = PickleDB(SETTINGS_FILE)
 
 
 def get_or_set(key: str, default):
-    with sdb:
-        if sdb.get(key) is None:
+    # PickleDB keeps the settings in memory, so the file is only written when the default is stored:
+    value = sdb.get(key)
+    if value is None:
+        with sdb:
             sdb.set(key, default)
+        value = default
 
-    return sdb.get(key)
+    return value
 
 
 def get_bilhetes_path() -> str:
@@ -33,21 +37,10 @@ def get_bilhetes_path() -> str:
     return get_or_set("bilhetes_path", "")
 
 
-def set_bilhetes_path(path: str) -> None:
-    with sdb:
-        sdb.set("bilhetes_path", path)
-
-
 def get_interval() -> int:
     return get_or_set("interval", DEFAULT_INTERVAL)
 
 
-def set_interval(interval: int) -> None:
-    with sdb:
-        interval = max(MIN_INTERVAL, min(interval, MAX_INTERVAL))
-        sdb.set("interval", interval)
-
-
 def get_cutoff():
     return get_or_set(
         "cutoff",
@@ -55,6 +48,29 @@ def get_cutoff():
     )
 
 
-def set_cutoff(cutoff):
+def get_cutoff_date() -> date:
+    return _parse_cutoff(get_cutoff())
+
+
+@lru_cache(maxsize=1)
+def _parse_cutoff(cutoff: str) -> date:
+    # Cached by the cutoff string, so a new cutoff is parsed once and no invalidation is needed:
+    return datetime.strptime(cutoff, "%d/%m/%Y").date()
+
+
+def set_settings(bilhetes_path: str, interval: int, cutoff) -> None:
+    settings = {
+        "bilhetes_path": bilhetes_path,
+        "interval": max(MIN_INTERVAL, min(interval, MAX_INTERVAL)),
+        "cutoff": cutoff,
+    }
+
+    # Only the changed settings are set, and the file isn't rewritten when none of them changed:
+    changed = {key: value for key, value in settings.items() if sdb.get(key) != value}
+    if not changed:
+        return
+
+    # Every setting is written with a single save, instead of one full file rewrite per setting:
     with sdb:
-        sdb.set("cutoff", cutoff)
+        for key, value in changed.items():
+            sdb.set(key, value)
@@ -1,34 +1,54 @@
 import asyncio
 import logging
-from datetime import datetime
+import sys
+from time import monotonic
 
 import httpx
 from packaging import version
 
-from topsoft.constants import UPDATE_URL
+from topsoft.activitysoft.api import close_clients
+from topsoft.constants import UPDATE_CHECK_INTERVAL, UPDATE_URL
+from topsoft.database import close_current_session
 from topsoft.models import Acesso
-from topsoft.settings import get_bilhetes_path, get_cutoff
+from topsoft.settings import get_bilhetes_path, get_cutoff_date
 from topsoft.utils import (
     fetch_and_sync_students,
     get_current_version,
     ingest_bilhetes,
     post_acessos_and_update_synced_status,
     wait_for_interval,
-    wait_until_next_hour,
 )
 
 logger = logging.getLogger(__name__)
 
 
-def task_processamento(stop_event, queue):
+def task_processamento(should_stop, wakeup, queue, widget):
     """
     Main background processing task.
+    The task runs until should_stop() returns True, waiting on the wakeup queue between cycles.
+    Processed access IDs are put into the queue and the widget is notified through the "<<ProcessingUpdate>>" virtual event.
+    Update checks run on this same thread, at most once every UPDATE_CHECK_INTERVAL minutes.
     """
 
     logger.info("Starting background processing task")
 
-    while not stop_event.is_set():
+    next_update_check = monotonic()
+
+    # A single event loop for the whole task, so the HTTP clients can be reused between cycles:
+    runner = asyncio.Runner(loop_factory=get_loop_factory())
+
+    while not should_stop():
         try:
+            # Start each cycle with a new session, so the records loaded by the previous cycle aren't reused
+            # (they never expire, and would miss e.g. the cards bound in the GUI since then):
+            close_current_session()
+
+            # 0 ========================================================================
+            # Check for updates:
+            if monotonic() >= next_update_check:
+                next_update_check = monotonic() + UPDATE_CHECK_INTERVAL * 60
+                check_for_updates()
+
             # 1 ========================================================================
             # Bilhetes path:
             logger.debug("Fetching bilhetes path")
@@ -38,8 +58,8 @@ def task_processamento(stop_event, queue):
                 logger.warning("Bilhetes path not found")
                 continue
 
-            # Check if the stop event is set before proceeding:
-            if stop_event.is_set():
+            # Check if the task should stop before proceeding:
+            if should_stop():
                 break
 
             # 2 ========================================================================
@@ -51,8 +71,8 @@ def task_processamento(stop_event, queue):
                 logger.error("Failed to update students")
                 continue
 
-            # Check if the stop event is set before proceeding:
-            if stop_event.is_set():
+            # Check if the task should stop before proceeding:
+            if should_stop():
                 break
 
             # 3 ========================================================================
@@ -62,12 +82,12 @@ def task_processamento(stop_event, queue):
             # TODO: Add a "processing" flag on queue to show a loading indicator in the GUI
 
             # Attempt to ingest bilhetes:
-            ingest_bilhetes(bilhetes_path, stop_event, batch_size=25000)
+            ingest_bilhetes(bilhetes_path, should_stop, batch_size=25000)
 
             # TODO: Add a "processed" flag on queue to show a success indicator in the GUI
 
-            # Check if the stop event is set after processing bilhetes:
-            if stop_event.is_set():
+            # Check if the task should stop after processing bilhetes:
+            if should_stop():
                 break
 
             # 4 ========================================================================
@@ -78,18 +98,18 @@ def task_processamento(stop_event, queue):
             acessos = Acesso.get_unsynced()
             logger.info(f"Found {len(acessos)} not synced access records")
 
-            if stop_event.is_set():
+            if should_stop():
                 break
 
             # 5 ========================================================================
             # Filter out old records based on cutoff:
             logger.debug("Filtering access records based on cutoff date")
 
-            cutoff = datetime.strptime(get_cutoff(), "%d/%m/%Y").date()
+            cutoff = get_cutoff_date()
             acessos = [a for a in acessos if a.date >= cutoff]
             logger.info(f"Filtered {len(acessos)} acessos before cutoff date {cutoff}")
 
-            if stop_event.is_set():
+            if should_stop():
                 break
 
             # 6 ========================================================================
@@ -98,11 +118,15 @@ def task_processamento(stop_event, queue):
             # TODO: Add a "processing" flag on queue to show a loading indicator in the GUI
 
             logger.debug("Posting access records to API and updating synced status")
-            results = asyncio.run(post_acessos_and_update_synced_status(acessos))
+            results = runner.run(
+                post_acessos_and_update_synced_status(acessos, should_stop)
+            )
 
-            if results:
+            # Once stopping, the GUI thread may be waiting on this thread, so it isn't notified anymore:
+            if results and not should_stop():
                 # Put the successfully processed access records into the queue:
-                queue.put([acesso.id for acesso in results])
+                queue.put_nowait([acesso.id for acesso in results])
+                widget.event_generate("<<ProcessingUpdate>>", when="tail")
                 logger.debug(f"Put {len(results)} access records into the queue")
 
             # TODO: Add a "processed" flag on queue to show a success indicator in the GUI
@@ -110,48 +134,71 @@ def task_processamento(stop_event, queue):
             logger.warning(f"Error na execução da tarefa: {e}")
             logger.exception(e)
         finally:
-            wait_for_interval(stop_event)
+            wait_for_interval(wakeup)
 
+    runner.run(close_clients())
+    runner.close()
+    close_current_session()
 
-def task_update_checker(stop_event):
+
+def get_loop_factory():
     """
-    Check for updates and apply them.
+    Get the event loop factory for the processing task.
+    uvloop (winloop on Windows) is used when installed, otherwise the default asyncio loop.
     """
 
-    while not stop_event.is_set():
-        try:
-            # Fetch the latest release information from the update URL:
-            response = httpx.get(UPDATE_URL)
+    try:
+        if sys.platform == "win32":
+            import winloop as loop_module
+        else:
+            import uvloop as loop_module
+    except ImportError:
+        return None
 
-            # Check if the response is successful:
-            if response.status_code != 200:
-                logger.warning(f"Failed to check for updates: {response.status_code}")
-                continue
+    logger.debug(f"Using {loop_module.__name__} event loop")
+    return loop_module.new_event_loop
 
-            # Parse the JSON response:
-            json_data = response.json()
-            if len(json_data) == 0:
-                logger.warning("Empty response from update URL")
-                continue
 
-            # Extract the latest release information:
-            latest_version = version.parse(json_data["tag_name"])
-
-            # Get the current version from the settings:
-            current_version = version.parse(get_current_version())
-
-            if latest_version > current_version:
-                # TODO: Differentiate between Windows/Linux/MacOS versions
-                logger.warning("Versão instalada não é a mais recente")
-                logger.warning(f"Versão mais recente: {latest_version}")
-                logger.warning(f"Versão atual: {current_version}")
+def check_for_updates():
+    """
+    Check whether a newer release is available.
+    """
 
-                # TODO: Alert the user about the new version (using the main GUI thread):
-                # Messagebox.show_info(
-                #     title="Atualização", message="Uma nova versão está disponível."
-                # )
-        except Exception as e:
-            logger.error(f"Error while checking for updates")
-            logger.exception(e)
-        finally:
-            wait_until_next_hour(stop_event)
+    # Without a known current version, every release would look newer:
+    current_version = get_current_version()
+    if current_version is None:
+        return
+
+    try:
+        # Fetch the latest release information from the update URL:
+        response = httpx.get(UPDATE_URL)
+
+        # Check if the response is successful:
+        if response.status_code != 200:
+            logger.warning(f"Failed to check for updates: {response.status_code}")
+            return
+
+        # Parse the JSON response:
+        json_data = response.json()
+        if len(json_data) == 0:
+            logger.warning("Empty response from update URL")
+            return
+
+        # Extract the latest release information:
+        latest_version = version.parse(json_data["tag_name"])
+
+        current_version = version.parse(current_version)
+
+        if latest_version > current_version:
+            # TODO: Differentiate between Windows/Linux/MacOS versions
+            logger.warning("Versão instalada não é a mais recente")
+            logger.warning(f"Versão mais recente: {latest_version}")
+            logger.warning(f"Versão atual: {current_version}")
+
+            # TODO: Alert the user about the new version (using the main GUI thread):
+            # Messagebox.show_info(
+            #     title="Atualização", message="Uma nova versão está disponível."
+            # )
+    except Exception as e:
+        logger.error(f"Error while checking for updates")
+        logger.exception(e)
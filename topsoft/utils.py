@@ -1,16 +1,23 @@
 import logging
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+from importlib import metadata
+from itertools import batched
 from os import path
-from time import sleep
+from queue import Empty
 from typing import List
 
 import toml
 from pygtail import Pygtail
 
-from topsoft.activitysoft.api import get_students_from_api, post_accessos_concurrently
-from topsoft.constants import OFFSET_PATH
+from topsoft.activitysoft.api import (
+    get_students_from_api,
+    group_pending_acessos,
+    post_accessos_concurrently,
+)
+from topsoft.constants import OFFSET_PATH, POST_BATCH_SIZE
 from topsoft.models import Acesso, Aluno
 from topsoft.repository import bulk_process_turnstile_events, process_turnstile_event
 from topsoft.settings import get_interval
@@ -28,26 +35,33 @@ def get_path(filename):
     return filename
 
 
-def get_current_version():
+@lru_cache(maxsize=1)
+def get_current_version() -> str | None:
     """
-    Get the current version of the application from pyproject.toml.
+    Get the current version of the application, from the installed package metadata or else from pyproject.toml.
+    Returns None when the version can't be found (e.g. a PyInstaller build, which bundles neither).
     """
 
+    try:
+        return metadata.version("topsoft")
+    except metadata.PackageNotFoundError:
+        pass
+
     try:
         with open("pyproject.toml", "r", encoding="utf-8") as f:
             pyproject_data = toml.load(f)
-            return pyproject_data.get("project", {}).get("version", "0.0.0")
+            return pyproject_data.get("project", {}).get("version")
     except FileNotFoundError:
-        logger.error("pyproject.toml not found")
+        logger.warning("Current version not found, update checks are disabled")
     except Exception as e:
         logger.error(f"Error reading pyproject.toml: {e}")
 
-    return "0.0.0"
+    return None
 
 
 def ingest_bilhetes(
     filepath,
-    stop_event,
+    should_stop,
     cutoff=None,
     batch_size=1000,
 ) -> List["Acesso"]:
@@ -58,7 +72,7 @@ def ingest_bilhetes(
 
     Parameters:
     - filepath (str): The path to the bilhetes file.
-    - stop_event (threading.Event): An event to signal when to stop processing.
+    - should_stop (Callable[[], bool]): Returns True when processing must stop.
     - cutoff (datetime, optional): If set, only records newer than this date will be processed.
     - force_read (bool): If True, the offset file will be deleted, forcing a full re-read of the bilhetes file.
     - batch_size (int): Number of events to process in each batch for bulk insertion.
@@ -101,15 +115,6 @@ def ingest_bilhetes(
             return fallback_tickets
 
     for n, raw_line in enumerate(reader):
-        # Before each raw_line, checks if the stop event is set to stop processing
-        if stop_event.is_set():
-            logger.info("Stopping extraction of bilhetes")
-            # Process any remaining events in the batch before stopping
-            if events_batch:
-                batch_tickets = process_batch(events_batch)
-                all_tickets.extend(batch_tickets)
-            return all_tickets
-
         # Skip empty lines, or malformed lines:
         parts = raw_line.strip().split()
         if len(parts) < 5:
@@ -145,6 +150,12 @@ def ingest_bilhetes(
             all_tickets.extend(batch_tickets)
             events_batch = []  # Reset batch
 
+            # Checks if the task should stop only between batches, keeping the line loop free of calls
+            # (every line read so far has been processed, so Pygtail's offset stays consistent)
+            if should_stop():
+                logger.info("Stopping extraction of bilhetes")
+                return all_tickets
+
     # Process any remaining events in the final batch
     if events_batch:
         batch_tickets = process_batch(events_batch)
@@ -154,50 +165,33 @@ def ingest_bilhetes(
     return all_tickets
 
 
-def wait_for_interval(stop_event):
+def wait_for_interval(wakeup):
     """
     Wait for the specified interval before the next processing cycle.
 
     Parameters:
-    - stop_event (threading.Event): An event to signal when to stop waiting.
+    - wakeup (queue.SimpleQueue): Anything put into this queue interrupts the wait.
 
     Returns:
     - None
     """
 
     intervalo = get_interval() * 60
+    logger.debug(f"Next processing in {intervalo} seconds")
 
-    for i in range(intervalo):
-        if stop_event.is_set():
-            logger.info("Stopping background task")
-            return
-
-        logger.debug(f"Next processing in {intervalo - i} seconds")
-        sleep(1)
-
-
-def wait_until_next_hour(stop_event):
-    """
-    Wait for the specified interval.
-
-    Parameters:
-    - stop_event (threading.Event): An event to signal when to stop waiting.
-
-    Returns:
-    - None
-    """
-
-    now = datetime.now()
-    next_hour = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-    sleep_duration = int((next_hour - now).total_seconds())
-
-    for i in range(sleep_duration):
-        if stop_event.is_set():
-            logger.info("Stopping update task")
-            return
-
-        logger.debug(f"Next update check in {sleep_duration - i} seconds")
-        sleep(1)
+    try:
+        message = wakeup.get(timeout=intervalo)
+        logger.info(f"Background task woken up: {message}")
+    except Empty:
+        return
+
+    # A burst of wakeups (e.g. saving the settings several times in a row) starts a single cycle.
+    # A None (stop) is safe to drain too, since should_stop() is set before it is sent:
+    while True:
+        try:
+            wakeup.get_nowait()
+        except Empty:
+            break
 
 
 def fetch_and_sync_students():
@@ -225,16 +219,20 @@ def fetch_and_sync_students():
         return False
 
 
-async def post_acessos_and_update_synced_status(acessos):
+async def post_acessos_and_update_synced_status(acessos, should_stop=None):
     """
     Consume the access records and process them.
     This function is called by the main task to handle the access records.
+    Records are grouped by payload first, so duplicates in different batches are still posted once.
+    Records are posted in batches of POST_BATCH_SIZE and each batch has its synced status updated
+    as soon as it is posted, so an interrupted run doesn't repost what was already sent.
 
     Parameters:
     - bilhetes (List[Acesso]): A list of access records to be processed.
+    - should_stop (Callable[[], bool], optional): Checked between batches to stop early.
 
     Returns:
-    - None
+    - List[Acesso]: The successfully processed access records.
     """
 
     # Check if there are any access records to process:
@@ -245,19 +243,34 @@ async def post_acessos_and_update_synced_status(acessos):
     # Log the start of processing access records:
     logger.info(f"Starting to process {len(acessos)} access records")
 
+    sucess_results = []
+
     # Post and update the access records:
     try:
-        # Post access records to the API:
-        logger.debug("Posting access records to the API")
-        results = await post_accessos_concurrently(acessos)
+        # Duplicates are grouped over all the records, so the same payload is never posted by two batches:
+        groups = list(group_pending_acessos(acessos).values())
+
+        for batch in batched(groups, POST_BATCH_SIZE):
+            # Post access records to the API:
+            logger.debug(f"Posting {len(batch)} groups of access records to the API")
+            results = await post_accessos_concurrently(batch)
 
-        # Filter successful results:
-        logger.debug(f"Filtering successful access records from {len(results)} results")
-        sucess_results = [r[0] for r in results if r[1] == True]
+            # Filter successful results:
+            logger.debug(
+                f"Filtering successful access records from {len(results)} results"
+            )
+            batch_results = [r[0] for r in results if r[1] == True]
+
+            # Bulk update the synced status of access records:
+            logger.debug(
+                f"Updating synced status for {len(batch_results)} access records"
+            )
+            Acesso.bulk_update_synced_status(batch_results, status=True)
+            sucess_results.extend(batch_results)
 
-        # Bulk update the synced status of access records:
-        logger.debug(f"Updating synced status for {len(sucess_results)} access records")
-        Acesso.bulk_update_synced_status(sucess_results, status=True)
+            # Check if the task should stop before the next batch:
+            if should_stop and should_stop():
+                break
 
         # Log and return the successfully processed access records:
         logger.info(f"Successfully processed {len(sucess_results)} access records")